@@ -30,7 +30,8 @@ target_metadata = SQLModel.metadata
 
 
 def get_url():
-    return str(settings.SQLALCHEMY_DATABASE_URI)
+    # Las migraciones no pasan por el pooler externo
+    return str(settings.SQLALCHEMY_DIRECT_DATABASE_URI)
 
 
 def run_migrations_offline():
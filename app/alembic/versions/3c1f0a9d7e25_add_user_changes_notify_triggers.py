@@ -0,0 +1,54 @@
+"""add user changes notify triggers
+
+Revision ID: 3c1f0a9d7e25
+Revises: f16259f62b21
+Create Date: 2026-10-17 11:02:14.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f0a9d7e25'
+down_revision: Union[str, None] = 'f16259f62b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Publica en el canal `user_changes` los ids de los usuarios modificados o
+    # eliminados para que cada worker invalide sus cachés en memoria
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_user_changes() RETURNS trigger AS $$
+        DECLARE
+            ids text;
+        BEGIN
+            FOR ids IN
+                SELECT string_agg(id::text, ',')
+                FROM (SELECT id, (row_number() OVER ()) / 200 AS chunk FROM old_rows) AS changed
+                GROUP BY chunk
+            LOOP
+                PERFORM pg_notify('user_changes', ids);
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER user_changes_update AFTER UPDATE ON "user"
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_user_changes()
+    """)
+    op.execute("""
+        CREATE TRIGGER user_changes_delete AFTER DELETE ON "user"
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_user_changes()
+    """)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS user_changes_delete ON "user"')
+    op.execute('DROP TRIGGER IF EXISTS user_changes_update ON "user"')
+    op.execute("DROP FUNCTION IF EXISTS notify_user_changes()")
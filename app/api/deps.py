@@ -1,4 +1,5 @@
-from collections.abc import Generator
+import hashlib
+from collections.abc import AsyncGenerator
 from typing import Annotated
 
 import jwt
@@ -7,9 +8,11 @@ from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
 import sqlalchemy
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app import crud
 from app.core import security
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.core.db import engine
 from app.models import User
@@ -20,16 +23,26 @@ reusable_oauth2 = OAuth2PasswordBearer(
 )
 
 
-def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    # Sin expirar en commit: tras un commit los atributos no se pueden
+    # recargar de forma implícita en una sesión asíncrona
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
 
 
-SessionDep = Annotated[Session, Depends(get_db)]
+SessionDep = Annotated[AsyncSession, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
+# Claims de tokens ya verificados, indexados por el digest del token.
+# Cada entrada expira en el `exp` del propio token.
+token_cache: TTLCache[bytes, TokenPayload] = TTLCache(settings.TOKEN_CACHE_SIZE)
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+
+def decode_token(token: str) -> TokenPayload:
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(key)
+    if token_data is not None:
+        return token_data
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -40,8 +53,16 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+    # Los tokens sin `exp` no se guardan: no hay un momento seguro para expirarlos
+    if isinstance(payload.get("exp"), (int, float)):
+        token_cache.set(key, token_data, expires_at=payload["exp"])
+    return token_data
+
+
+async def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    token_data = decode_token(token)
     try:
-        user = session.get(User, token_data.sub)
+        user = await crud.get_user_by_id(session=session, user_id=token_data.sub)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         if not user.is_active:
@@ -54,7 +75,7 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
-def get_current_active_superuser(current_user: CurrentUser) -> User:
+async def get_current_active_superuser(current_user: CurrentUser) -> User:
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=403, detail="The user doesn't have enough privileges"
@@ -1,9 +1,10 @@
 from fastapi import APIRouter
 
-from app.api.routes import login, auth, users
+from app.api.routes import login, auth, users, utils
 
 api_router = APIRouter()
 
 api_router.include_router(login.router, tags=["login"])
 api_router.include_router(auth.router, tags=["auth"])
-api_router.include_router(users.router, prefix="/users", tags=["users"])
\ No newline at end of file
+api_router.include_router(users.router, prefix="/users", tags=["users"])
+api_router.include_router(utils.router, prefix="/utils", tags=["utils"])
\ No newline at end of file
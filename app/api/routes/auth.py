@@ -3,6 +3,7 @@ import pyotp
 import pyqrcode
 
 from fastapi import APIRouter, Depends, HTTPException, Response, logger
+from fastapi.concurrency import run_in_threadpool
 
 from app import crud
 from app.api.deps import SessionDep, get_current_user
@@ -28,17 +29,18 @@ async def otp_enable(session: SessionDep,
     success = security.verify_otp(otp.totp_code, user.otp_secret)
     if not success:
         raise HTTPException(status_code=400, detail="Invalid OTP")
-    user = crud.enable_otp(session=session, db_user=user)
+    user = await crud.enable_otp(session=session, db_user=user)
     return UserPublic.model_validate(user)
 
 
 @router.get("/auth/otp/generate")
-def generate_qr_code(session: SessionDep, user: User = Depends(get_current_user)):
+async def generate_qr_code(session: SessionDep, user: User = Depends(get_current_user)):
     if user.otp_enabled:
         raise HTTPException(status_code=400, detail="OTP already enabled")
-    crud.config_otp(session=session, db_user=user)
+    await crud.config_otp(session=session, db_user=user)
     qr_code = generate_qr(user)
     img_byte_arr = io.BytesIO()
-    qr_code.png(img_byte_arr, scale=5)
+    # Renderizar el PNG es trabajo de CPU: se hace fuera del event loop
+    await run_in_threadpool(qr_code.png, img_byte_arr, scale=5)
     img_byte_arr = img_byte_arr.getvalue()
     return Response(content=img_byte_arr, media_type="image/png")
@@ -2,6 +2,7 @@ from datetime import timedelta
 from typing import Annotated, Any
 
 from fastapi import APIRouter, Depends, Form, HTTPException, logger, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
 
@@ -15,7 +16,6 @@ from app import crud
 from app.api.deps import CurrentUser, SessionDep
 from app.core import security
 from app.core.config import settings
-from app.core.security import get_password_hash
 from app.schemas import Message, NewPassword, Token, UserPublic
 from app.utils import (
     generate_password_reset_token,
@@ -35,7 +35,7 @@ class TOTPValidationRequest(SQLModel):
 
 @router.post("/login/access-token")
 @limiter.limit("5/minute")
-def login_access_token(
+async def login_access_token(
     session: SessionDep,
     request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
@@ -43,7 +43,7 @@ def login_access_token(
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.authenticate(
+    user = await crud.authenticate(
         session=session, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -92,7 +92,7 @@ def login_access_token(
 
 @router.post("/login/access-token/otp")
 @limiter.limit("5/minute")
-def login_access_token_otp(
+async def login_access_token_otp(
     session: SessionDep,
     request: Request,
     temp_token: Annotated[str, Form()], totp_code: Annotated[str, Form()]
@@ -112,7 +112,7 @@ def login_access_token_otp(
 
         # Obtener usuario y su secreto TOTP
 
-        user = crud.validate_otp(
+        user = await crud.validate_otp(
             session=session, email=username, totp_code=totp_code)
 
         if not user:
@@ -144,7 +144,7 @@ def login_access_token_otp(
 
 
 @router.post("/login/test-token", response_model=UserPublic)
-def token_test(current_user: CurrentUser) -> Any:
+async def token_test(current_user: CurrentUser) -> Any:
     """
     Test access token
     """
@@ -152,11 +152,11 @@ def token_test(current_user: CurrentUser) -> Any:
 
 
 @router.post("/password-recovery/{email}")
-def recover_password(email: str, session: SessionDep) -> Message:
+async def recover_password(email: str, session: SessionDep) -> Message:
     """
     Password Recovery
     """
-    user = crud.get_user_by_email(session=session, email=email)
+    user = await crud.get_user_by_email(session=session, email=email)
 
     if user:
         password_reset_token = generate_password_reset_token(email=email)
@@ -173,7 +173,9 @@ def recover_password(email: str, session: SessionDep) -> Message:
                 }
             }
         ]
-        app.mails.send_email(
+        # El cliente de MailerSend es síncrono
+        await run_in_threadpool(
+            app.mails.send_email,
             template_key="password_reset",
             recipients=[{"name": user.full_name, "email": user.email}],
             personalization_data=email_data,
@@ -183,7 +185,7 @@ def recover_password(email: str, session: SessionDep) -> Message:
 
 
 @router.post("/reset-password/")
-def reset_password(session: SessionDep, body: NewPassword) -> Message:
+async def reset_password(session: SessionDep, body: NewPassword) -> Message:
     """
     Reset password
     """
@@ -193,7 +195,7 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
         raise HTTPException(status_code=400, detail="Invalid token")
 
     # Obtener el usuario por email
-    user = crud.get_user_by_email(session=session, email=email)
+    user = await crud.get_user_by_email(session=session, email=email)
     if not user:
         raise HTTPException(
             status_code=404, detail="The user with this email does not exist in the system.")
@@ -201,12 +203,13 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
         raise HTTPException(status_code=400, detail="Inactive user")
 
     # Actualizar la contraseña del usuario
-    user.hashed_password = get_password_hash(body.new_password)
+    user.hashed_password = await security.hasher.hash(body.new_password)
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    crud.invalidate_user(user.id)
+    await session.refresh(user)
 
-    assert security.verify_password(
+    assert await security.hasher.verify(
         body.new_password, user.hashed_password), "Password hashing failed!"
 
     return Message(message="Password updated successfully")
@@ -1,11 +1,14 @@
 
-from typing import Any
-from fastapi import APIRouter, HTTPException
+from typing import Any, Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy import delete
 
 from app import crud
-from app.api.deps import CurrentUser, SessionDep
+from app import user_import
+from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
 from app.core import security
+from app.core.db import engine
 from app.schemas import Message, UpdatePassword, UserCreate, UserPublic, UserRegister, UserUpdateMe
 
 from slowapi.errors import RateLimitExceeded
@@ -15,7 +18,7 @@ router = APIRouter()
 
 
 @router.patch("/me", response_model=UserPublic)
-def update_user_me(
+async def update_user_me(
     *, session: SessionDep, user_in: UserUpdateMe, current_user: CurrentUser
 ) -> Any:
     """
@@ -23,42 +26,39 @@ def update_user_me(
     """
 
     if user_in.email:
-        existing_user = crud.get_user_by_email(
+        existing_user = await crud.get_user_by_email(
             session=session, email=user_in.email)
         if existing_user and existing_user.id != current_user.id:
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
             )
-    user_data = user_in.model_dump(exclude_unset=True)
-    current_user.sqlmodel_update(user_data)
-    session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
-    return current_user
+    return await crud.update_user(
+        session=session, db_user=current_user, user_in=user_in)
 
 
 @router.patch("/me/password", response_model=Message)
-def update_password_me(
+async def update_password_me(
     *, session: SessionDep, body: UpdatePassword, current_user: CurrentUser
 ) -> Any:
     """
     Update own password.
     """
-    if not security.verify_password(body.current_password, current_user.hashed_password):
+    if not await security.hasher.verify(body.current_password, current_user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect password")
     if body.current_password == body.new_password:
         raise HTTPException(
             status_code=400, detail="New password cannot be the same as the current one"
         )
-    hashed_password = security.get_password_hash(body.new_password)
+    hashed_password = await security.hasher.hash(body.new_password)
     current_user.hashed_password = hashed_password
     session.add(current_user)
-    session.commit()
+    await session.commit()
+    crud.invalidate_user(current_user.id)
     return Message(message="Password updated successfully")
 
 
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUser) -> Any:
+async def read_user_me(current_user: CurrentUser) -> Any:
     """
     Get current user.
     """
@@ -66,7 +66,7 @@ def read_user_me(current_user: CurrentUser) -> Any:
 
 
 @router.delete("/me", response_model=Message)
-def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
+async def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
     """
     Delete own user.
     """
@@ -74,22 +74,48 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    session.delete(current_user)
-    session.commit()
+    await session.delete(current_user)
+    await session.commit()
+    crud.invalidate_user(current_user.id)
     return Message(message="User deleted successfully")
 
 
 @router.post("/signup", response_model=UserPublic)
-def register_user(session: SessionDep, user_in: UserRegister) -> Any:
+async def register_user(session: SessionDep, user_in: UserRegister) -> Any:
     """
     Create new user without the need to be logged in.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
-    if user:
+    user_create = UserCreate.model_validate(user_in)
+    user = await crud.create_user_if_absent(session=session, user_create=user_create)
+    if not user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system",
         )
-    user_create = UserCreate.model_validate(user_in)
-    user = crud.create_user(session=session, user_create=user_create)
     return user
+
+
+@router.post("/import", dependencies=[Depends(get_current_active_superuser)])
+async def import_users(
+    request: Request,
+    format: Literal["csv", "ndjson"] = "csv",
+    skip: int = Query(default=0, ge=0),
+    chunk_size: int = Query(default=1000, ge=1, le=10000),
+) -> StreamingResponse:
+    """
+    Bulk import users from a CSV or NDJSON request body.
+
+    Streams one NDJSON progress line per loaded chunk. After a failure, resend
+    the body with `skip` set to the last reported `processed` to resume.
+    """
+    records = user_import.parse_records(user_import.iter_lines(request.stream()), format)
+
+    async def progress_lines():
+        # Un solo proceso de hashing para dejar el resto libre para los logins
+        async for progress in user_import.import_users(
+            records, engine=engine, hashing=security.hasher,
+            chunk_size=chunk_size, skip=skip, jobs=1,
+        ):
+            yield progress.model_dump_json() + "\n"
+
+    return StreamingResponse(progress_lines(), media_type="application/x-ndjson")
@@ -0,0 +1,20 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from app.api.deps import get_current_active_superuser
+from app.core.db import engine
+from app.core.pool import InstrumentedAsyncQueuePool
+
+router = APIRouter()
+
+
+@router.get("/db-pool", dependencies=[Depends(get_current_active_superuser)])
+async def db_pool_stats() -> dict[str, Any]:
+    """
+    Connection pool usage of the worker that serves the request.
+    """
+    if not isinstance(engine.pool, InstrumentedAsyncQueuePool):
+        # Detrás de un pooler externo no hay pool propio que medir
+        return {"pool": engine.pool.status()}
+    return engine.pool.stats()
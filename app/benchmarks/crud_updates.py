@@ -0,0 +1,101 @@
+"""
+Compara las escrituras de una columna de `crud` contra la implementación anterior.
+
+La versión anterior reescribía la fila completa (`model_dump` +
+`sqlmodel_update`), confirmaba y volvía a leerla con `session.refresh`; la
+actual emite un único `UPDATE ... RETURNING`. Se cuentan las sentencias
+enviadas al servidor (sin contar el COMMIT) y se mide la latencia por
+operación contra la base de datos configurada.
+
+Uso:
+    python -m app.benchmarks.crud_updates [--iterations 500]
+"""
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import crud
+from app.core.db import engine
+from app.core.security import generate_otp_secret
+from app.hash_calibration import percentile
+from app.models import User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def legacy_config_otp(*, session: AsyncSession, db_user: User) -> User:
+    """Implementación anterior de `crud.config_otp`, como referencia."""
+    user_data = db_user.model_dump()
+    db_user.sqlmodel_update(user_data, update={"otp_secret": generate_otp_secret()})
+    session.add(db_user)
+    await session.commit()
+    await session.refresh(db_user)
+    return db_user
+
+
+@contextmanager
+def count_statements(db_engine: AsyncEngine) -> Iterator[list[str]]:
+    statements: list[str] = []
+
+    def listener(conn, cursor, statement, *args) -> None:
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", listener)
+
+
+async def measure(
+    operation: Callable[..., Awaitable[User]], session: AsyncSession, user: User, iterations: int
+) -> tuple[float, list[float]]:
+    """Devuelve las sentencias por operación y las latencias en milisegundos."""
+    latencies = []
+    with count_statements(engine) as statements:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            user = await operation(session=session, db_user=user)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return len(statements) / iterations, latencies
+
+
+async def run(iterations: int) -> None:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = User(email=f"benchmark-{uuid.uuid4()}@example.com", hashed_password="-")
+        session.add(user)
+        await session.commit()
+        try:
+            for name, operation in (
+                ("full row + refresh", legacy_config_otp),
+                ("UPDATE ... RETURNING", crud.config_otp),
+            ):
+                per_op, latencies = await measure(operation, session, user, iterations)
+                logger.info(
+                    "%-22s %.1f statements/op  p50 %.2f ms  p99 %.2f ms",
+                    name, per_op, percentile(latencies, 50), percentile(latencies, 99),
+                )
+        finally:
+            await session.delete(user)
+            await session.commit()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Caché LRU en memoria con expiración por entrada.
+
+    Cada entrada expira en `expires_at` (timestamp epoch) o, si no se indica,
+    `ttl` segundos después de guardarse. Es segura entre hilos porque las
+    dependencias síncronas de FastAPI se ejecutan en el threadpool.
+    Con `maxsize=0` la caché queda deshabilitada.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V, *, expires_at: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        if expires_at is None:
+            if self.ttl is None:
+                raise ValueError("expires_at is required when the cache has no ttl")
+            expires_at = time.time() + self.ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
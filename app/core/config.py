@@ -1,7 +1,7 @@
 import secrets
 import warnings
 import boto3
-from typing import Annotated, Any, Literal, List, Union
+from typing import Annotated, Any, Literal, List, Optional, Union
 from pydantic import (
     AnyUrl,
     BeforeValidator,
@@ -63,7 +63,30 @@ class Settings(BaseSettings):
     TEMP_TOKEN_EXPIRE_MINUTES: int = 5  # 5 minutos de duración
     FRONTEND_HOST: str = "http://localhost:3000"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
-    
+
+    # ---------------------------
+    # Configuración de hashing de contraseñas
+    # ---------------------------
+    # El esquema configurado se usa para hashes nuevos; los hashes con otro esquema
+    # o con un costo distinto se re-hashean de forma transparente en el login.
+    PASSWORD_HASH_SCHEME: Literal["bcrypt", "argon2"] = "bcrypt"
+    PASSWORD_HASH_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_ARGON2_MEMORY_COST: int = 65536  # KiB
+    PASSWORD_HASH_ARGON2_TIME_COST: int = 3
+    PASSWORD_HASH_ARGON2_PARALLELISM: int = 1
+    PASSWORD_HASH_P99_BUDGET_MS: float = 250.0  # Presupuesto usado por `python -m app.hash_calibration`
+    PASSWORD_HASH_WORKERS: int = 2  # Procesos dedicados al hashing por worker de la API
+    PASSWORD_HASH_MAX_PENDING: int = 64  # Operaciones en cola antes de responder 503
+    PASSWORD_HASH_TIMEOUT_SECONDS: float = 5.0  # Tiempo máximo de espera por operación
+
+    # ---------------------------
+    # Configuración de cachés en memoria (por worker)
+    # ---------------------------
+    TOKEN_CACHE_SIZE: int = 10000  # Tokens verificados en caché; 0 la deshabilita
+    USER_CACHE_SIZE: int = 10000  # Usuarios autenticados en caché; 0 la deshabilita
+    USER_CACHE_TTL_SECONDS: float = 60  # Cota del retraso si falla la invalidación por NOTIFY
+    USER_CHANGES_LISTENER_ENABLED: bool = True  # Invalida las cachés con LISTEN/NOTIFY entre workers
+
     # ---------------------------
     # Configuración de TOTP
     # ---------------------------
@@ -88,6 +111,31 @@ class Settings(BaseSettings):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str = ""
     POSTGRES_DB: str = ""
+    # Postgres sin pasar por el pooler externo, para LISTEN/NOTIFY y migraciones.
+    # Vacíos equivalen a POSTGRES_SERVER / POSTGRES_PORT.
+    POSTGRES_DIRECT_SERVER: str = ""
+    POSTGRES_DIRECT_PORT: Optional[int] = None
+
+    # ---------------------------
+    # Configuración del pool de conexiones (por worker)
+    # ---------------------------
+    # Con DB_MAX_CONNECTIONS el presupuesto total se reparte entre API_WORKERS y
+    # limita DB_POOL_SIZE + DB_MAX_OVERFLOW en cada worker.
+    # "internal": SQLAlchemy mantiene el pool; "transaction": la API está detrás
+    # de un pooler en modo transacción (PgBouncer), que es quien limita las
+    # conexiones; no se usa pool propio ni prepared statements del servidor.
+    DB_POOLING_MODE: Literal["internal", "transaction"] = "internal"
+    API_WORKERS: int = 2  # Debe coincidir con `--workers` del Dockerfile
+    DB_MAX_CONNECTIONS: Optional[int] = None  # Conexiones de Postgres reservadas para la API
+    DB_POOL_SIZE: int = 5  # Conexiones que el pool mantiene abiertas
+    DB_MAX_OVERFLOW: int = 10  # Conexiones adicionales si el pool está lleno
+    DB_POOL_TIMEOUT_SECONDS: float = 30  # Espera máxima por una conexión libre
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Edad máxima de una conexión antes de reciclarla
+    # "pre_ping" verifica cada conexión al tomarla del pool (un round trip extra
+    # por request); "background" las verifica periódicamente en segundo plano y
+    # las lecturas reintentan una vez si la conexión resultó estar cortada.
+    DB_LIVENESS_MODE: Literal["pre_ping", "background"] = "pre_ping"
+    DB_LIVENESS_INTERVAL_SECONDS: float = 60  # Debe ser menor que el timeout de inactividad del servidor
 
     @computed_field
     @property
@@ -105,6 +153,22 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    @computed_field
+    @property
+    def SQLALCHEMY_DIRECT_DATABASE_URI(self) -> PostgresDsn:
+        """
+        Devuelve la URI de conexión directa a PostgreSQL, sin el pooler externo.
+        Se usa para las conexiones que necesitan estado de sesión.
+        """
+        return MultiHostUrl.build(
+            scheme="postgresql+psycopg",
+            username=self.POSTGRES_USER,
+            password=self.POSTGRES_PASSWORD,
+            host=self.POSTGRES_DIRECT_SERVER or self.POSTGRES_SERVER,
+            port=self.POSTGRES_DIRECT_PORT or self.POSTGRES_PORT,
+            path=self.POSTGRES_DB,
+        )
+
     # ---------------------------
     # Configuración de Usuario y Contraseña
     # ---------------------------
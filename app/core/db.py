@@ -1,22 +1,60 @@
-from sqlmodel import Session, create_engine, select
+import asyncio
+import logging
+from typing import Any, Callable
+
+import psycopg
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app import crud
 from app.core.config import settings
-from sqlalchemy.pool import QueuePool
+from app.core.pool import InstrumentedAsyncQueuePool, pool_limits
 
-from app.models import User
+from app.models import USER_CHANGES_CHANNEL, User
 from app.schemas import UserCreate
 
-engine = create_engine(
+logger = logging.getLogger(__name__)
+
+
+def engine_options(pooling_mode: str) -> dict[str, Any]:
+    """Devuelve los argumentos de `create_async_engine` para el modo de pooling."""
+    if pooling_mode == "transaction":
+        return {
+            # El pooler externo ya reutiliza las conexiones al servidor
+            "poolclass": NullPool,
+            # psycopg prepara en el servidor las consultas repetidas, pero la
+            # siguiente transacción puede ir a otra conexión del pooler
+            "connect_args": {"prepare_threshold": None},
+        }
+    pool_size, max_overflow = pool_limits(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        max_connections=settings.DB_MAX_CONNECTIONS,
+        workers=settings.API_WORKERS,
+        # El listener de LISTEN/NOTIFY usa una conexión propia fuera del pool
+        reserved=1 if settings.USER_CHANGES_LISTENER_ENABLED else 0,
+    )
+    return {
+        # Configuración necesaria para evitar desconexiones en producción ya que
+        # Neon cierra las conexiones después de un tiempo de inactividad
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        # Verifica si la conexión es válida antes de usarla
+        "pool_pre_ping": settings.DB_LIVENESS_MODE == "pre_ping",
+    }
+
+
+# Motor asíncrono (psycopg en modo async): las requests esperan la red sin
+# ocupar un hilo del threadpool
+engine = create_async_engine(
     str(settings.SQLALCHEMY_DATABASE_URI),
     echo=False,
-    # Configuración necesaria para evitar desconexiones en producción ya que
-    # Neon cierra las conexiones después de un tiempo de inactividad
-    poolclass=QueuePool,
-    pool_size=5,              # Número máximo de conexiones en el pool
-    max_overflow=10,          # Conexiones adicionales si el pool está lleno
-    pool_timeout=30,          # Tiempo máximo para esperar una conexión libre
-    pool_recycle=1800,        # Tiempo (en segundos) para reciclar conexiones y evitar desconexiones
-    pool_pre_ping=True        # Verifica si la conexión es válida antes de usarla
+    **engine_options(settings.DB_POOLING_MODE),
 )
 
 
@@ -25,7 +63,7 @@ engine = create_engine(
 # for more details: https://github.com/fastapi/full-stack-fastapi-template/issues/28
 
 
-def init_db(session: Session) -> None:
+async def init_db(session: AsyncSession) -> None:
     # Tables should be created with Alembic migrations
     # But if you don't want to use migrations, create
     # the tables un-commenting the next lines
@@ -34,13 +72,43 @@ def init_db(session: Session) -> None:
     # This works because the models are already imported and registered from app.models
     # SQLModel.metadata.create_all(engine)
 
-    user = session.exec(
+    user = (await session.exec(
         select(User).where(User.email == settings.FIRST_SUPERUSER)
-    ).first()
+    )).first()
     if not user:
         user_in = UserCreate(
             email=settings.FIRST_SUPERUSER,
             password=settings.FIRST_SUPERUSER_PASSWORD,
             is_superuser=True,
         )
-        user = crud.create_user(session=session, user_create=user_in)
+        user = await crud.create_user(session=session, user_create=user_in)
+
+
+async def listen_user_changes(
+    on_change: Callable[[str], None],
+    on_reconnect: Callable[[], None],
+    retry_seconds: float = 5.0,
+) -> None:
+    """
+    Escucha el canal `user_changes` y llama a `on_change` con cada id recibido.
+
+    Usa una conexión dedicada y directa a PostgreSQL: LISTEN es estado de
+    sesión y no funciona a través de un pooler en modo transacción. Si la conexión se pierde se reintenta, y como las notificaciones
+    emitidas mientras tanto se pierden se llama a `on_reconnect` para descartar
+    todo lo que pudiera haber quedado obsoleto.
+    """
+    url = make_url(str(settings.SQLALCHEMY_DIRECT_DATABASE_URI))
+    conninfo = url.set(drivername="postgresql").render_as_string(hide_password=False)
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as conn:
+                await conn.execute(f"LISTEN {USER_CHANGES_CHANNEL}")
+                on_reconnect()
+                async for notify in conn.notifies():
+                    for user_id in notify.payload.split(","):
+                        on_change(user_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("User changes listener disconnected, retrying")
+        await asyncio.sleep(retry_seconds)
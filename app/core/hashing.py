@@ -0,0 +1,139 @@
+import asyncio
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from passlib.context import CryptContext
+
+# Este módulo no importa `app.core.config` a propósito: los procesos worker
+# se crean con "spawn" y solo necesitan la configuración del CryptContext.
+
+_worker_context: Optional[CryptContext] = None
+
+
+def _init_worker(context_config: str) -> None:
+    """Inicializa el CryptContext dentro de cada proceso worker."""
+    global _worker_context
+    _worker_context = CryptContext.from_string(context_config)
+
+
+def _hash(password: str) -> str:
+    return _worker_context.hash(password)
+
+
+def _hash_many(passwords: list[str]) -> list[str]:
+    return [_worker_context.hash(password) for password in passwords]
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return _worker_context.verify(plain_password, hashed_password)
+
+
+class HashingUnavailableError(Exception):
+    """El servicio de hashing está saturado o no respondió a tiempo."""
+
+
+class HashingService:
+    """
+    Ejecuta el hashing de contraseñas en un pool de procesos acotado.
+
+    bcrypt es CPU-bound y mantiene el GIL ocupado, así que ejecutarlo en el
+    threadpool de anyio deja sin hilos al resto de endpoints. Este servicio lo
+    delega a procesos dedicados con su propia cola: si hay más de
+    `max_pending` operaciones en curso o una tarda más de `timeout` segundos
+    se lanza `HashingUnavailableError`.
+    """
+
+    def __init__(
+        self,
+        context_config: str,
+        *,
+        max_workers: int,
+        max_pending: int,
+        timeout: float,
+    ) -> None:
+        self.context_config = context_config
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Número de operaciones encoladas o en ejecución."""
+        return self._pending
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # El pool se crea de forma perezosa para no lanzar procesos al importar
+        # el módulo (alembic, scripts de arranque, tests que no hashean, etc.)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.context_config,),
+                )
+            return self._pool
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashingUnavailableError("Password hashing queue is full")
+            self._pending += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def _submit(
+        self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None
+    ) -> Any:
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_pool(), fn, *args)
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise HashingUnavailableError("Password hashing timed out")
+        except BrokenProcessPool:
+            self.shutdown(wait=False)
+            raise HashingUnavailableError("Password hashing pool is broken")
+        finally:
+            self._release()
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def hash_many(self, passwords: list[str], *, jobs: Optional[int] = None) -> list[str]:
+        """
+        Hashea un lote repartido en `jobs` trabajos (por defecto uno por worker).
+
+        Cada trabajo ocupa un solo lugar de la cola y su timeout escala con la
+        cantidad de contraseñas que contiene.
+        """
+        if not passwords:
+            return []
+        jobs = min(jobs or self.max_workers, len(passwords))
+        size = math.ceil(len(passwords) / jobs)
+        batches = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+        results = await asyncio.gather(*(
+            self._submit(_hash_many, batch, timeout=self.timeout * len(batch))
+            for batch in batches
+        ))
+        return [hashed for batch in results for hashed in batch]
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify, plain_password, hashed_password)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Detiene los procesos worker; el pool se recrea en el siguiente uso."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,187 @@
+import asyncio
+import bisect
+import functools
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Límites superiores (en segundos) de los buckets del histograma de espera
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def pool_limits(
+    *,
+    pool_size: int,
+    max_overflow: int,
+    max_connections: int | None,
+    workers: int,
+    reserved: int = 0,
+) -> tuple[int, int]:
+    """
+    Calcula `(pool_size, max_overflow)` para un worker.
+
+    Sin `max_connections` se usan los valores configurados. Con un presupuesto
+    total de conexiones se reparte entre los workers, descontando las
+    conexiones `reserved` que cada worker abre fuera del pool, y el pool se
+    recorta para que pool + overflow nunca lo excedan.
+    """
+    if max_connections is None:
+        return pool_size, max_overflow
+    per_worker = max_connections // workers - reserved
+    if per_worker < 1:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={max_connections} is not enough for "
+            f"{workers} workers with {reserved} reserved connections each"
+        )
+    size = min(pool_size, per_worker)
+    return size, min(max_overflow, per_worker - size)
+
+
+class PoolMetrics:
+    """
+    Contadores de uso del pool: checkouts, timeouts y un histograma
+    acumulativo del tiempo de espera para obtener una conexión.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = CHECKOUT_WAIT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self._counts = [0] * (len(buckets) + 1)
+        self._lock = threading.Lock()
+
+    def observe_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self._counts[bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def histogram(self) -> dict[str, int]:
+        """Conteos acumulados por bucket, con el formato `le` de Prometheus."""
+        histogram = {}
+        total = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self._counts):
+            total += count
+            histogram[str(bound)] = total
+        return histogram
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self._counts = [0] * (len(self.buckets) + 1)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Pool asíncrono de SQLAlchemy que registra la espera de cada checkout."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.observe_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self) -> "InstrumentedAsyncQueuePool":
+        # `engine.dispose()` reemplaza el pool: las métricas se conservan
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout_seconds": self.timeout(),
+            "checkouts": self.metrics.checkouts,
+            "timeouts": self.metrics.timeouts,
+            "checkout_wait_seconds_total": self.metrics.wait_seconds_total,
+            "checkout_wait_seconds_bucket": self.metrics.histogram(),
+        }
+
+
+async def ping_idle_connections(engine: AsyncEngine) -> int:
+    """
+    Hace un `SELECT 1` sobre cada conexión libre del pool.
+
+    El pool es FIFO, así que tomar y devolver una conexión tantas veces como
+    conexiones libres hay recorre todas. Si una está cortada SQLAlchemy
+    invalida el pool completo y las siguientes iteraciones reabren las
+    conexiones aquí en lugar de en una request. Devuelve las fallidas.
+    """
+    failed = 0
+    for _ in range(engine.pool.checkedin()):
+        try:
+            async with engine.connect() as connection:
+                await connection.exec_driver_sql("SELECT 1")
+        except exc.DBAPIError as e:
+            if not e.connection_invalidated:
+                raise
+            failed += 1
+    return failed
+
+
+async def keep_pool_alive(engine: AsyncEngine, interval_seconds: float) -> None:
+    """Ejecuta `ping_idle_connections` cada `interval_seconds`."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            failed = await ping_idle_connections(engine)
+            if failed:
+                logger.warning("Replaced %d disconnected pooled connections", failed)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Pool liveness check failed")
+
+
+def retry_on_disconnect(
+    func: Callable[..., Awaitable[T]],
+) -> Callable[..., Awaitable[T]]:
+    """
+    Reintenta una vez una lectura que falla porque la conexión estaba cortada.
+
+    Sin `pool_pre_ping` una conexión cerrada por el servidor solo se detecta al
+    usarla. Solo se reintenta si la sesión no tenía una transacción abierta
+    antes de la llamada: así no se pierde trabajo previo sin confirmar.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, session: AsyncSession, **kwargs: Any) -> T:
+        in_transaction = session.in_transaction()
+        try:
+            return await func(*args, session=session, **kwargs)
+        except exc.DBAPIError as e:
+            if in_transaction or not e.connection_invalidated:
+                raise
+            logger.warning("Database connection lost, retrying %s", func.__name__)
+            await session.rollback()
+            return await func(*args, session=session, **kwargs)
+
+    return wrapper
@@ -9,8 +9,52 @@ from slowapi.util import get_remote_address
 
 
 from app.core.config import settings
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.hashing import HashingService
+
+
+def build_pwd_context(
+    scheme: str,
+    *,
+    bcrypt_rounds: int,
+    argon2_memory_cost: int,
+    argon2_time_cost: int,
+    argon2_parallelism: int,
+) -> CryptContext:
+    """
+    Construye el CryptContext con el esquema indicado como predeterminado.
+
+    Ambos esquemas se mantienen registrados para poder verificar hashes
+    existentes; `deprecated="auto"` y los costos mínimos hacen que
+    `needs_update` marque los hashes del otro esquema o de menor costo.
+    """
+    schemes = [scheme] + [other for other in ("bcrypt", "argon2") if other != scheme]
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__time_cost=argon2_time_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+pwd_context = build_pwd_context(
+    settings.PASSWORD_HASH_SCHEME,
+    bcrypt_rounds=settings.PASSWORD_HASH_BCRYPT_ROUNDS,
+    argon2_memory_cost=settings.PASSWORD_HASH_ARGON2_MEMORY_COST,
+    argon2_time_cost=settings.PASSWORD_HASH_ARGON2_TIME_COST,
+    argon2_parallelism=settings.PASSWORD_HASH_ARGON2_PARALLELISM,
+)
+
+# Hashing fuera del event loop y del threadpool para las rutas de la API
+hasher = HashingService(
+    pwd_context.to_string(),
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    timeout=settings.PASSWORD_HASH_TIMEOUT_SECONDS,
+)
 
 
 ALGORITHM = "HS256"
@@ -31,6 +75,10 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+
 def generate_otp_secret() -> str:
     return pyotp.random_base32()
 
@@ -1,85 +1,204 @@
+import asyncio
+import logging
 import uuid
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core.security import get_password_hash, verify_otp, verify_password, generate_otp_secret
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.pool import retry_on_disconnect
+from app.core.security import hasher, password_needs_rehash, verify_otp, generate_otp_secret
 from app.models import User
-from app.schemas import UserCreate, UserUpdate
+from app.schemas import UserCreate, UserUpdate, UserUpdateMe
 from typing import Union
 
+logger = logging.getLogger(__name__)
 
-def create_user(*, session: Session, user_create: UserCreate) -> User:
+# Referencias a las tareas en segundo plano para que no sean recolectadas
+_background_tasks: set[asyncio.Task] = set()
+
+# Snapshot de las columnas de los usuarios autenticados, indexado por id.
+# Toda escritura sobre un usuario debe llamar a `invalidate_user`.
+user_cache: TTLCache[str, dict[str, Any]] = TTLCache(
+    settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_user(user_id: uuid.UUID | str) -> None:
+    user_cache.pop(str(user_id))
+
+
+@retry_on_disconnect
+async def get_user_by_id(*, session: AsyncSession, user_id: uuid.UUID | str) -> User | None:
+    """
+    Obtiene un usuario por id pasando primero por `user_cache`.
+
+    En un acierto no hay round trip a la base de datos: se construye una
+    instancia nueva a partir del snapshot y se asocia a la sesión como si se
+    hubiera cargado, así cada request trabaja con su propio objeto.
+    """
+    key = str(user_id)
+    data = user_cache.get(key)
+    if data is not None:
+        user = User(**data)
+        make_transient_to_detached(user)
+        return await session.merge(user, load=False)
+    user = await session.get(User, user_id)
+    if user:
+        user_cache.set(key, {
+            column.key: getattr(user, column.key) for column in User.__table__.columns
+        })
+    return user
+
+
+async def create_user(*, session: AsyncSession, user_create: UserCreate) -> User:
     db_obj = User.model_validate(
         user_create, update={
-            "hashed_password": get_password_hash(user_create.password)}
+            "hashed_password": await hasher.hash(user_create.password)}
     )
     session.add(db_obj)
-    session.commit()
-    session.refresh(db_obj)
+    await session.commit()
+    await session.refresh(db_obj)
     return db_obj
 
 
-def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
+async def create_user_if_absent(*, session: AsyncSession, user_create: UserCreate) -> User | None:
+    """
+    Crea el usuario con un único `INSERT ... ON CONFLICT (email) DO NOTHING RETURNING`.
+
+    Devuelve `None` si el email ya está registrado, incluso cuando otro registro
+    concurrente con el mismo email gana la carrera. El hash se calcula siempre,
+    así que la respuesta tarda lo mismo exista o no el email.
+    """
+    db_obj = User.model_validate(
+        user_create, update={
+            "hashed_password": await hasher.hash(user_create.password)}
+    )
+    statement = (
+        insert(User)
+        .values({column.key: getattr(db_obj, column.key) for column in User.__table__.columns})
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
+    )
+    db_user = (await session.exec(statement)).scalar_one_or_none()
+    await session.commit()
+    return db_user
+
+
+async def _update_returning(*, session: AsyncSession, db_user: User, values: dict[str, Any]) -> User:
+    """
+    Actualiza solo las columnas indicadas con un `UPDATE ... RETURNING`.
+
+    La fila devuelta refresca `db_user` en la misma ida y vuelta (no hace falta
+    un `session.refresh` posterior) y luego se confirma la transacción.
+    """
+    statement = (
+        update(User)
+        .where(User.id == db_user.id)
+        .values(**values)
+        .returning(User)
+    )
+    result = await session.exec(
+        statement, execution_options={"populate_existing": True}
+    )
+    db_user = result.scalar_one()
+    await session.commit()
+    invalidate_user(db_user.id)
+    return db_user
+
+
+async def update_user(
+    *, session: AsyncSession, db_user: User, user_in: UserUpdate | UserUpdateMe
+) -> Any:
     user_data = user_in.model_dump(exclude_unset=True)
-    extra_data = {}
     if "password" in user_data:
-        password = user_data["password"]
-        hashed_password = get_password_hash(password)
-        extra_data["hashed_password"] = hashed_password
-    if "otp_enabled" in user_data:
-        if user_data["otp_enabled"]:
-            extra_data["otp_secret"] = generate_otp_secret()
-    db_user.sqlmodel_update(user_data, update=extra_data)
-    session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
-    return db_user
+        password = user_data.pop("password")
+        user_data["hashed_password"] = await hasher.hash(password)
+    if user_data.get("otp_enabled"):
+        user_data["otp_secret"] = generate_otp_secret()
+    if not user_data:
+        return db_user
+    return await _update_returning(session=session, db_user=db_user, values=user_data)
 
 
-def get_user_by_email(*, session: Session, email: str) -> User | None:
+@retry_on_disconnect
+async def get_user_by_email(*, session: AsyncSession, email: str) -> User | None:
     statement = select(User).where(User.email == email)
-    session_user = session.exec(statement).first()
+    session_user = (await session.exec(statement)).first()
     return session_user
 
 
-def config_otp(*, session: Session, db_user: User) -> User:
-    user_data = db_user.model_dump()
-    extra_data = {"otp_secret": generate_otp_secret()}
-    db_user.sqlmodel_update(user_data, update=extra_data)
-    session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
-    return db_user
+async def config_otp(*, session: AsyncSession, db_user: User) -> User:
+    return await _update_returning(
+        session=session, db_user=db_user, values={"otp_secret": generate_otp_secret()}
+    )
 
 
-def enable_otp(*, session: Session, db_user: User) -> User:
-    user_data = db_user.model_dump()
-    extra_data = {"otp_enabled": True}
-    db_user.sqlmodel_update(user_data, update=extra_data)
-    session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
-    return db_user
+async def enable_otp(*, session: AsyncSession, db_user: User) -> User:
+    return await _update_returning(
+        session=session, db_user=db_user, values={"otp_enabled": True}
+    )
 
-def get_otp_user_by_email(*, session: Session, email: str) -> User | None:
+@retry_on_disconnect
+async def get_otp_user_by_email(*, session: AsyncSession, email: str) -> User | None:
     statement = select(User).where(User.email == email)
-    session_user = session.exec(statement).first()
+    session_user = (await session.exec(statement)).first()
     return session_user.otp_enabled
 
 
-def authenticate(*, session: Session, email: str, password: str) -> User | None:
-    db_user = get_user_by_email(session=session, email=email)
+async def authenticate(*, session: AsyncSession, email: str, password: str) -> User | None:
+    db_user = await get_user_by_email(session=session, email=email)
     if not db_user:
         return None
-    if not verify_password(password, db_user.hashed_password):
+    if not await hasher.verify(password, db_user.hashed_password):
         return None
+    if password_needs_rehash(db_user.hashed_password):
+        # El re-hash no bloquea el login: se hace con una sesión propia
+        task = asyncio.create_task(rehash_password(
+            engine=session.bind,
+            user_id=db_user.id,
+            password=password,
+            current_hash=db_user.hashed_password,
+        ))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
 
     return db_user
 
 
-def validate_otp(*, session: Session, email: str, totp_code: str) -> User | None:
-    db_user = get_user_by_email(session=session, email=email)
+async def rehash_password(
+    *, engine: AsyncEngine, user_id: uuid.UUID, password: str, current_hash: str
+) -> bool:
+    """
+    Re-hashea la contraseña con el esquema y costo configurados.
+
+    La actualización solo se aplica si el hash no cambió mientras tanto, para no
+    pisar un cambio de contraseña concurrente.
+    """
+    try:
+        new_hash = await hasher.hash(password)
+        async with AsyncSession(engine) as session:
+            statement = (
+                update(User)
+                .where(User.id == user_id, User.hashed_password == current_hash)
+                .values(hashed_password=new_hash)
+            )
+            result = await session.exec(statement)
+            await session.commit()
+        invalidate_user(user_id)
+        return result.rowcount == 1
+    except Exception:
+        logger.exception("Could not rehash password for user %s", user_id)
+        return False
+
+
+async def validate_otp(*, session: AsyncSession, email: str, totp_code: str) -> User | None:
+    db_user = await get_user_by_email(session=session, email=email)
     if not db_user:
         return None
     if db_user.otp_enabled:
@@ -0,0 +1,141 @@
+"""
+Calibra el costo del hashing de contraseñas para la máquina actual.
+
+Mide la latencia de `verify` (el costo que paga cada login) con varios
+parámetros, ejecutando tantas verificaciones en paralelo como procesos de
+hashing tiene la API, y recomienda los parámetros más fuertes cuyo p99 cabe en
+el presupuesto configurado.
+
+Uso:
+    python -m app.hash_calibration [--scheme argon2] [--budget-ms 250]
+"""
+import argparse
+import logging
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.core.security import build_pwd_context
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BCRYPT_ROUNDS = [10, 11, 12, 13, 14, 15, 16]
+# (memory_cost en KiB, time_cost), ordenados de menor a mayor costo
+ARGON2_PARAMS = [
+    (19456, 2),
+    (32768, 2),
+    (47104, 2),
+    (65536, 2),
+    (65536, 3),
+    (131072, 3),
+    (262144, 3),
+    (262144, 4),
+]
+
+SAMPLE_PASSWORD = "calibration-password"
+
+
+@dataclass
+class Candidate:
+    scheme: str
+    bcrypt_rounds: int = settings.PASSWORD_HASH_BCRYPT_ROUNDS
+    argon2_memory_cost: int = settings.PASSWORD_HASH_ARGON2_MEMORY_COST
+    argon2_time_cost: int = settings.PASSWORD_HASH_ARGON2_TIME_COST
+    argon2_parallelism: int = settings.PASSWORD_HASH_ARGON2_PARALLELISM
+
+    def context(self) -> CryptContext:
+        return build_pwd_context(
+            self.scheme,
+            bcrypt_rounds=self.bcrypt_rounds,
+            argon2_memory_cost=self.argon2_memory_cost,
+            argon2_time_cost=self.argon2_time_cost,
+            argon2_parallelism=self.argon2_parallelism,
+        )
+
+    def settings_env(self) -> dict[str, str]:
+        env = {"PASSWORD_HASH_SCHEME": self.scheme}
+        if self.scheme == "bcrypt":
+            env["PASSWORD_HASH_BCRYPT_ROUNDS"] = str(self.bcrypt_rounds)
+        else:
+            env["PASSWORD_HASH_ARGON2_MEMORY_COST"] = str(self.argon2_memory_cost)
+            env["PASSWORD_HASH_ARGON2_TIME_COST"] = str(self.argon2_time_cost)
+            env["PASSWORD_HASH_ARGON2_PARALLELISM"] = str(self.argon2_parallelism)
+        return env
+
+
+def candidates(scheme: str) -> list[Candidate]:
+    if scheme == "bcrypt":
+        return [Candidate(scheme, bcrypt_rounds=rounds) for rounds in BCRYPT_ROUNDS]
+    return [
+        Candidate(scheme, argon2_memory_cost=memory_cost, argon2_time_cost=time_cost)
+        for memory_cost, time_cost in ARGON2_PARAMS
+    ]
+
+
+def _timed_verify(candidate: Candidate, hashed_password: str) -> float:
+    context = candidate.context()
+    start = time.perf_counter()
+    context.verify(SAMPLE_PASSWORD, hashed_password)
+    return (time.perf_counter() - start) * 1000
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def measure(candidate: Candidate, pool: ProcessPoolExecutor, samples: int) -> float:
+    """Devuelve el p99 en milisegundos de `verify` con los parámetros dados."""
+    hashed_password = candidate.context().hash(SAMPLE_PASSWORD)
+    latencies = list(
+        pool.map(_timed_verify, [candidate] * samples, [hashed_password] * samples)
+    )
+    return percentile(latencies, 99)
+
+
+def calibrate(
+    scheme: str, budget_ms: float, samples: int, concurrency: int
+) -> Optional[Candidate]:
+    best = None
+    with ProcessPoolExecutor(max_workers=concurrency) as pool:
+        for candidate in candidates(scheme):
+            p99 = measure(candidate, pool, samples)
+            logger.info("%s -> p99 %.1f ms", candidate.settings_env(), p99)
+            if p99 > budget_ms:
+                # El costo crece de forma monótona: los siguientes tampoco caben
+                break
+            best = candidate
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=settings.PASSWORD_HASH_SCHEME)
+    parser.add_argument("--budget-ms", type=float, default=settings.PASSWORD_HASH_P99_BUDGET_MS)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    args = parser.parse_args()
+
+    logger.info(
+        "Calibrating %s for a p99 budget of %.0f ms with %d parallel hashes",
+        args.scheme, args.budget_ms, args.concurrency,
+    )
+    best = calibrate(args.scheme, args.budget_ms, args.samples, args.concurrency)
+    if best is None:
+        logger.error("No parameters fit the budget, the cheapest candidate is already too slow")
+        raise SystemExit(1)
+
+    logger.info("Recommended settings:")
+    for name, value in best.settings_env().items():
+        print(f"{name}={value}")
+
+
+if __name__ == "__main__":
+    main()
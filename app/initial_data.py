@@ -1,6 +1,7 @@
+import asyncio
 import logging
 
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.db import engine, init_db
 
@@ -8,14 +9,15 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def init() -> None:
-    with Session(engine) as session:
-        init_db(session)
+async def init() -> None:
+    async with AsyncSession(engine) as session:
+        await init_db(session)
+    await engine.dispose()
 
 
 def main() -> None:
     logger.info("Creating initial data")
-    init()
+    asyncio.run(init())
     logger.info("Initial data created")
 
 
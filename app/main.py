@@ -1,28 +1,70 @@
-from fastapi import FastAPI
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 from slowapi.middleware import SlowAPIMiddleware
-from app.core.security import limiter
+from app.core.security import hasher, limiter
+from app.core.hashing import HashingUnavailableError
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
+from app import crud
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.db import engine, listen_user_changes
+from app.core.pool import keep_pool_alive
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if settings.USER_CHANGES_LISTENER_ENABLED:
+        # Invalida la caché de usuarios de este worker cuando otro los modifica
+        tasks.append(asyncio.create_task(
+            listen_user_changes(crud.invalidate_user, crud.user_cache.clear)
+        ))
+    if settings.DB_POOLING_MODE == "internal" and settings.DB_LIVENESS_MODE == "background":
+        # Mantiene vivas las conexiones libres sin un ping por request
+        tasks.append(asyncio.create_task(
+            keep_pool_alive(engine, settings.DB_LIVENESS_INTERVAL_SECONDS)
+        ))
+    yield
+    for task in tasks:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    # Detener los procesos de hashing al apagar el worker
+    hasher.shutdown()
+    await engine.dispose()
+
+
+def hashing_unavailable_handler(request: Request, exc: HashingUnavailableError) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service temporarily unavailable, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Add SlowAPI middleware
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(HashingUnavailableError, hashing_unavailable_handler)
 
 # Set all CORS enabled origins
 if settings.all_cors_origins:
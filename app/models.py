@@ -1,3 +1,4 @@
+from sqlalchemy import DDL, event
 from sqlmodel import Field, SQLModel
 from app.schemas import UserBase
 from sqlalchemy.dialects.postgresql import JSONB
@@ -8,5 +9,44 @@ import uuid
 class User(UserBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     hashed_password: str
-    otp_secret: str | None = Field(default=None) 
+    otp_secret: str | None = Field(default=None)
 
+
+# Canal de LISTEN/NOTIFY por el que se publican los ids de usuarios modificados
+# o eliminados; ver `app.core.db.listen_user_changes`.
+USER_CHANGES_CHANNEL = "user_changes"
+
+# Los triggers son por sentencia y agrupan los ids en lotes de 200 para no
+# superar el límite de 8000 bytes del payload de NOTIFY en actualizaciones masivas.
+# Se crean con la migración 3c1f0a9d7e25; este DDL los instala también cuando
+# las tablas se crean con `create_all` (tests).
+user_changes_ddl = [
+    DDL(f"""
+CREATE OR REPLACE FUNCTION notify_user_changes() RETURNS trigger AS $$
+DECLARE
+    ids text;
+BEGIN
+    FOR ids IN
+        SELECT string_agg(id::text, ',')
+        FROM (SELECT id, (row_number() OVER ()) / 200 AS chunk FROM old_rows) AS changed
+        GROUP BY chunk
+    LOOP
+        PERFORM pg_notify('{USER_CHANGES_CHANNEL}', ids);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""),
+    DDL("""
+CREATE TRIGGER user_changes_update AFTER UPDATE ON "user"
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_user_changes()
+"""),
+    DDL("""
+CREATE TRIGGER user_changes_delete AFTER DELETE ON "user"
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_user_changes()
+"""),
+]
+for ddl in user_changes_ddl:
+    event.listen(User.__table__, "after_create", ddl.execute_if(dialect="postgresql"))
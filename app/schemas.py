@@ -1,5 +1,6 @@
 from typing import Annotated, Literal
-from pydantic import EmailStr
+from pydantic import EmailStr, computed_field, model_validator
+from typing_extensions import Self
 from sqlmodel import SQLModel, Field
 
 
@@ -41,6 +42,36 @@ class UserRegister(SQLModel):
     full_name: str | None = Field(default=None, max_length=255)
 
 
+class UserImport(SQLModel):
+    """Registro de la importación masiva: contraseña en claro o hash existente."""
+    email: EmailStr = Field(max_length=255)
+    full_name: str | None = Field(default=None, max_length=255)
+    is_active: bool = True
+    password: str | None = Field(default=None, min_length=8, max_length=40)
+    hashed_password: str | None = None
+
+    @model_validator(mode="after")
+    def _password_or_hash(self) -> Self:
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("exactly one of password or hashed_password is required")
+        return self
+
+
+class UserImportProgress(SQLModel):
+    processed: int = 0  # Registros leídos de la entrada, incluidos los omitidos con `skip`
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+
+    @computed_field
+    @property
+    def rate(self) -> float:
+        """Usuarios insertados por segundo."""
+        return self.inserted / self.seconds if self.seconds else 0.0
+
+
 class UserUpdate(SQLModel):
     email: EmailStr | None = Field(default=None, max_length=255)
     password: str | None = Field(default=None, min_length=8, max_length=40)
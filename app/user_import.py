@@ -0,0 +1,256 @@
+"""
+Importa usuarios de forma masiva desde CSV o NDJSON (un registro por línea).
+
+Las contraseñas en claro se hashean en el pool de procesos; los hashes
+existentes (bcrypt o argon2) se conservan tal cual y se migran al esquema
+configurado en el siguiente login. Cada lote se carga con COPY en una tabla
+temporal y un `INSERT ... ON CONFLICT (email) DO NOTHING`, así que volver a
+importar un archivo no duplica usuarios. El CLI guarda un checkpoint después
+de cada lote confirmado y al reiniciarse continúa desde ahí.
+
+Uso:
+    python -m app.user_import users.csv [--format ndjson] [--chunk-size 5000]
+"""
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.hashing import HashingService
+from app.core.security import pwd_context
+from app.models import User
+from app.schemas import UserImport, UserImportProgress
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "ndjson")
+COLUMNS = [column.key for column in User.__table__.columns]
+TABLE = f'"{User.__tablename__}"'
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Convierte un stream de bytes UTF-8 en líneas, sin cargarlo completo."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def parse_records(lines: AsyncIterable[str], fmt: str) -> AsyncIterator[Optional[dict[str, Any]]]:
+    """
+    Devuelve un diccionario por registro, o `None` si la línea no se puede leer.
+
+    En CSV la primera línea es la cabecera y las celdas vacías se omiten. Los
+    campos entre comillas no pueden contener saltos de línea.
+    """
+    header = None
+    async for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        if fmt == "ndjson":
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+        elif header is None:
+            header = next(csv.reader([line]))
+        else:
+            values = next(csv.reader([line]))
+            yield {key: value for key, value in zip(header, values) if value != ""}
+
+
+def validate_record(record: Optional[dict[str, Any]]) -> Optional[UserImport]:
+    if not isinstance(record, dict):
+        return None
+    try:
+        user = UserImport.model_validate(record)
+    except ValidationError:
+        return None
+    if user.hashed_password is not None and pwd_context.identify(
+        user.hashed_password, required=False
+    ) is None:
+        return None
+    return user
+
+
+async def load_chunk(
+    users: list[UserImport], *, engine: AsyncEngine, hashing: HashingService, jobs: Optional[int] = None
+) -> int:
+    """Hashea y carga un lote con COPY. Devuelve cuántos usuarios se insertaron."""
+    if not users:
+        return 0
+    hashes = iter(await hashing.hash_many(
+        [user.password for user in users if user.password is not None], jobs=jobs
+    ))
+    rows = []
+    for user in users:
+        values = {
+            "id": uuid.uuid4(),
+            "email": user.email,
+            "full_name": user.full_name,
+            "is_active": user.is_active,
+            "is_superuser": False,
+            "otp_enabled": False,
+            "otp_secret": None,
+            "hashed_password": user.hashed_password or next(hashes),
+        }
+        rows.append(tuple(values[column] for column in COLUMNS))
+
+    columns = ", ".join(COLUMNS)
+    async with engine.connect() as connection:
+        # COPY no está expuesto por SQLAlchemy: se usa la conexión de psycopg
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        try:
+            async with driver_connection.cursor() as cursor:
+                # La tabla temporal vive solo durante la transacción, así que
+                # también funciona detrás de un pooler en modo transacción
+                await cursor.execute(
+                    f"CREATE TEMP TABLE user_import (LIKE {TABLE}) ON COMMIT DROP"
+                )
+                async with cursor.copy(f"COPY user_import ({columns}) FROM STDIN") as copy:
+                    for row in rows:
+                        await copy.write_row(row)
+                await cursor.execute(
+                    f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM user_import "
+                    "ON CONFLICT (email) DO NOTHING"
+                )
+                inserted = cursor.rowcount
+            await driver_connection.commit()
+        except BaseException:
+            await driver_connection.rollback()
+            raise
+    return inserted
+
+
+async def import_users(
+    records: AsyncIterable[Optional[dict[str, Any]]],
+    *,
+    engine: AsyncEngine,
+    hashing: HashingService,
+    chunk_size: int,
+    skip: int = 0,
+    jobs: Optional[int] = None,
+) -> AsyncIterator[UserImportProgress]:
+    """
+    Importa los registros por lotes y devuelve el progreso después de cada uno.
+
+    Los primeros `skip` registros se omiten sin validarlos ni hashearlos: para
+    reanudar una importación se usa el último `processed` reportado. Si un lote
+    falla se devuelve un último progreso con `error` y la importación se detiene.
+    """
+    progress = UserImportProgress(processed=skip)
+    start = time.perf_counter()
+    chunk: list[UserImport] = []
+    invalid = 0
+
+    async def flush(processed: int) -> None:
+        nonlocal chunk, invalid
+        inserted = await load_chunk(chunk, engine=engine, hashing=hashing, jobs=jobs)
+        progress.inserted += inserted
+        progress.duplicates += len(chunk) - inserted
+        progress.invalid += invalid
+        progress.processed = processed
+        progress.seconds = time.perf_counter() - start
+        chunk, invalid = [], 0
+
+    index = 0
+    try:
+        async for record in records:
+            index += 1
+            if index <= skip:
+                continue
+            user = validate_record(record)
+            if user is None:
+                logger.warning("Skipping invalid record %d", index)
+                invalid += 1
+            else:
+                chunk.append(user)
+            if index - progress.processed >= chunk_size:
+                await flush(index)
+                yield progress.model_copy()
+        if index > progress.processed:
+            await flush(index)
+            yield progress.model_copy()
+    except Exception as e:
+        logger.exception("User import failed after %d records", progress.processed)
+        progress.error = str(e)
+        progress.seconds = time.perf_counter() - start
+        yield progress
+
+
+async def _read_lines(path: Path) -> AsyncIterator[str]:
+    with path.open(encoding="utf-8", newline="") as file:
+        for line in file:
+            yield line
+
+
+async def run(path: Path, fmt: str, chunk_size: int, workers: int, checkpoint: Path) -> bool:
+    skip = int(checkpoint.read_text()) if checkpoint.exists() else 0
+    if skip:
+        logger.info("Resuming after record %d from %s", skip, checkpoint)
+    # Pool propio con todos los CPUs: no comparte la cola con la API
+    hashing = HashingService(
+        pwd_context.to_string(),
+        max_workers=workers,
+        max_pending=workers,
+        timeout=settings.PASSWORD_HASH_TIMEOUT_SECONDS,
+    )
+    records = parse_records(_read_lines(path), fmt)
+    try:
+        async for progress in import_users(
+            records, engine=engine, hashing=hashing, chunk_size=chunk_size, skip=skip
+        ):
+            if progress.error:
+                logger.error("Import stopped: %s", progress.error)
+                return False
+            checkpoint.write_text(str(progress.processed))
+            logger.info(
+                "%d records processed: %d inserted, %d duplicates, %d invalid (%.0f users/s)",
+                progress.processed, progress.inserted, progress.duplicates,
+                progress.invalid, progress.rate,
+            )
+    finally:
+        hashing.shutdown()
+        await engine.dispose()
+    checkpoint.unlink(missing_ok=True)
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--checkpoint", type=Path, help="Defaults to <path>.checkpoint")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.suffix == ".csv" else "ndjson")
+    checkpoint = args.checkpoint or args.path.with_name(args.path.name + ".checkpoint")
+    if not asyncio.run(run(args.path, fmt, args.chunk_size, args.workers, checkpoint)):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
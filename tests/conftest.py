@@ -1,11 +1,20 @@
 import pytest
 
 from dotenv import load_dotenv
-from sqlmodel import Session, create_engine, SQLModel
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import create_engine, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models import User
 
 load_dotenv(".env.test", override=True)
 from app.core.config import settings
+# Backend de anyio para los tests asíncronos
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
 # Fixture para crear el motor de la base de datos
 @pytest.fixture(scope="session")
 def engine():
@@ -21,28 +30,33 @@ def engine():
 
 # Fixture para crear una sesión de base de datos
 @pytest.fixture(scope="function")
-def session(engine):
-    """Proporcionar una sesión de base de datos para cada prueba."""
-    # Crear una sesión de base de datos
-    session = Session(engine)
-    
+async def session(engine):
+    """Proporcionar una sesión asíncrona de base de datos para cada prueba."""
+    # Cada prueba corre en su propio event loop: sin pool para no reutilizar
+    # conexiones creadas en un loop anterior
+    async_engine = create_async_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI), poolclass=NullPool
+    )
+    session = AsyncSession(async_engine, expire_on_commit=False)
+
     # Limpiar la base de datos antes de cada prueba
-    _clear_db(session)
-    
+    await _clear_db(session)
+
     # Devolver la sesión
     yield session
-    
+
     # Cerrar la sesión después de cada prueba
-    session.close()
+    await session.close()
+    await async_engine.dispose()
 
-def _clear_db(session):
+async def _clear_db(session):
     """Limpiar la base de datos antes de cada prueba."""
     # Borrar todos los registros de las tablas
     for table in reversed(SQLModel.metadata.sorted_tables):
-        session.execute(table.delete())
-    
+        await session.execute(table.delete())
+
     # Confirmar los cambios
-    session.commit()
+    await session.commit()
 
 
 @pytest.fixture
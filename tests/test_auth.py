@@ -7,7 +7,7 @@ from fastapi import status
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch
 
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.main import app  # Importa tu aplicación FastAPI
 from app.models import User
@@ -18,23 +18,25 @@ from app.schemas import UserCreate  # Asegúrate de tener esta función
 
 client = TestClient(app)
 
+pytestmark = pytest.mark.anyio
+
 
 # Mock para obtener el usuario actual sin OTP habilitado
-def mock_get_current_user_otp_disabled(session):
-    return create_user(session=session, user_create=UserCreate(id=str(uuid.uuid4()),  email="test@example.com", password="password123"))
+async def mock_get_current_user_otp_disabled(session):
+    return await create_user(session=session, user_create=UserCreate(id=str(uuid.uuid4()),  email="test@example.com", password="password123"))
 
 
 # Mock para obtener el usuario actual con OTP habilitado
-def mock_get_current_user_otp_enabled(session):
-    user = create_user(session=session, user_create=UserCreate(id=str(uuid.uuid4(
+async def mock_get_current_user_otp_enabled(session):
+    user = await create_user(session=session, user_create=UserCreate(id=str(uuid.uuid4(
     )), otp_secret=pyotp.random_base32(), email="test@example.com", password="password123"))
-    config_otp(session=session, db_user=user)
-    enable_otp(session=session, db_user=user)
+    await config_otp(session=session, db_user=user)
+    await enable_otp(session=session, db_user=user)
     return user
 
 
 # Mock para habilitar OTP
-def mock_enable_otp(session, db_user):
+async def mock_enable_otp(session, db_user):
     db_user.otp_enabled = True
     return db_user
 
@@ -52,9 +54,9 @@ def get_auth_headers(user):
 # Test para habilitar OTP
 @patch("app.api.deps.get_current_user", mock_get_current_user_otp_disabled)
 @patch("app.crud.enable_otp", mock_enable_otp)
-def test_enable_otp(session: Session):
-    user = mock_get_current_user_otp_disabled(session)
-    config_otp(session=session, db_user=user)
+async def test_enable_otp(session: AsyncSession):
+    user = await mock_get_current_user_otp_disabled(session)
+    await config_otp(session=session, db_user=user)
     headers = get_auth_headers(user)
     otp = {"totp_code": pyotp.TOTP(user.otp_secret).now()}
     response = client.put("/api/v1/auth/otp/enable", headers=headers, json=otp)
@@ -64,8 +66,8 @@ def test_enable_otp(session: Session):
 
 # Test para habilitar OTP cuando ya está habilitado
 @patch("app.api.deps.get_current_user", mock_get_current_user_otp_enabled)
-def test_enable_otp_already_enabled(session: Session):
-    user = mock_get_current_user_otp_enabled(session)
+async def test_enable_otp_already_enabled(session: AsyncSession):
+    user = await mock_get_current_user_otp_enabled(session)
     headers = get_auth_headers(user)
     otp = {"totp_code": pyotp.TOTP(user.otp_secret).now()}
     response = client.put("/api/v1/auth/otp/enable", headers=headers, json=otp)
@@ -75,8 +77,8 @@ def test_enable_otp_already_enabled(session: Session):
 
 # Test para generar un código QR
 @patch("app.api.deps.get_current_user", mock_get_current_user_otp_disabled)
-def test_generate_qr_code(session: Session):
-    user = mock_get_current_user_otp_disabled(session)
+async def test_generate_qr_code(session: AsyncSession):
+    user = await mock_get_current_user_otp_disabled(session)
     headers = get_auth_headers(user)
     response = client.get("/api/v1/auth/otp/generate", headers=headers)
     assert response.status_code == status.HTTP_200_OK
@@ -88,8 +90,8 @@ def test_generate_qr_code(session: Session):
 
 
 @patch("app.api.deps.get_current_user", mock_get_current_user_otp_enabled)
-def test_generate_qr_code_already_enabled(session: Session):
-    user = mock_get_current_user_otp_enabled(session)
+async def test_generate_qr_code_already_enabled(session: AsyncSession):
+    user = await mock_get_current_user_otp_enabled(session)
     headers = get_auth_headers(user)
     response = client.get("/api/v1/auth/otp/generate", headers=headers)
     assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,42 @@
+import time
+
+from app.core.cache import TTLCache
+
+
+def test_get_and_set():
+    cache = TTLCache(maxsize=2, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats() == {"size": 1, "maxsize": 2, "hits": 1, "misses": 1}
+
+
+def test_entry_expires_at_given_time():
+    cache = TTLCache(maxsize=2)
+    cache.set("expired", 1, expires_at=time.time() - 1)
+    cache.set("valid", 2, expires_at=time.time() + 60)
+    assert cache.get("expired") is None
+    assert cache.get("valid") == 2
+    assert len(cache) == 1
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_pop_and_disabled_cache():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.pop("a")
+    assert cache.get("a") is None
+
+    disabled = TTLCache(maxsize=0, ttl=60)
+    disabled.set("a", 1)
+    assert disabled.get("a") is None
@@ -1,15 +1,20 @@
+import asyncio
 from unittest.mock import patch
 import pytest
-from sqlmodel import Session
+from passlib.context import CryptContext
+from sqlalchemy import event
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.crud import config_otp, create_user, update_user, get_user_by_email, authenticate, get_otp_user_by_email, enable_otp, validate_otp
 from app.schemas import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, password_needs_rehash, verify_password
+from app import crud
 import pyotp
 
+pytestmark = pytest.mark.anyio
 
 @pytest.fixture
-def user(session):
-    return create_user(
+async def user(session):
+    return await create_user(
         session=session,
         user_create=UserCreate(
             email="test@example.com",
@@ -20,86 +25,166 @@ def user(session):
 
 
 @pytest.fixture
-def user_with_otp(session,user):
-    config_otp(session=session, db_user=user)
-    enable_otp(session=session, db_user=user)
+async def user_with_otp(session,user):
+    await config_otp(session=session, db_user=user)
+    await enable_otp(session=session, db_user=user)
     return user
 
 
-def test_create_user(session: Session, user):
+async def test_create_user(session: AsyncSession, user):
     assert user.email == "test@example.com"
     assert user.hashed_password != "password123"
     assert verify_password("password123", user.hashed_password)
 
 
-def test_update_user(session: Session, user):
+async def test_update_user(session: AsyncSession, user):
     previous_hashed_password = str(user.hashed_password)
     user_update = UserUpdate(password="newpassword123")
-    updated_user = update_user(
+    updated_user = await update_user(
         session=session, db_user=user, user_in=user_update)
     assert updated_user.hashed_password != previous_hashed_password
     assert verify_password("newpassword123", updated_user.hashed_password)
 
 
-def test_get_user_by_email(session: Session):
+async def test_get_user_by_email(session: AsyncSession):
     user_create = UserCreate(email="test@example.com",
                              password="password123", username="test@example.com")
-    create_user(session=session, user_create=user_create)
-    user = get_user_by_email(session=session, email="test@example.com")
+    await create_user(session=session, user_create=user_create)
+    user = await get_user_by_email(session=session, email="test@example.com")
     assert user is not None
     assert user.email == "test@example.com"
 
 
-def test_authenticate(session: Session):
+async def test_authenticate(session: AsyncSession):
     user_create = UserCreate(email="test@example.com",
                              password="password123", username="test@example.com")
-    create_user(session=session, user_create=user_create)
-    user = authenticate(
+    await create_user(session=session, user_create=user_create)
+    user = await authenticate(
         session=session, email="test@example.com", password="password123")
     assert user is not None
     assert user.email == "test@example.com"
-    assert authenticate(session=session, email="test@example.com",
+    assert await authenticate(session=session, email="test@example.com",
                         password="wrongpassword") is None
 
 
-def test_enable_otp(session: Session, user):
-    enable_otp(session=session, db_user=user)
+async def test_authenticate_rehashes_outdated_hash(session: AsyncSession, user):
+    # Hash con un costo menor al configurado, como los de una versión anterior
+    weak_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    user.hashed_password = weak_context.hash("password123")
+    session.add(user)
+    await session.commit()
+    assert password_needs_rehash(user.hashed_password)
+
+    assert await authenticate(
+        session=session, email="test@example.com", password="password123") is not None
+    await asyncio.gather(*crud._background_tasks)
+
+    await session.refresh(user)
+    assert not password_needs_rehash(user.hashed_password)
+    assert verify_password("password123", user.hashed_password)
+
+
+async def test_rehash_password_skips_changed_hash(session: AsyncSession, user):
+    current_hash = user.hashed_password
+    rehashed = await crud.rehash_password(
+        engine=session.bind, user_id=user.id, password="password123",
+        current_hash="outdated-hash")
+    assert rehashed is False
+    await session.refresh(user)
+    assert user.hashed_password == current_hash
+
+
+async def test_get_user_by_id_uses_cache(session: AsyncSession, user):
+    crud.user_cache.clear()
+    assert (await crud.get_user_by_id(session=session, user_id=user.id)).id == user.id
+    with patch.object(session, "get") as mock_get:
+        cached_user = await crud.get_user_by_id(session=session, user_id=str(user.id))
+        mock_get.assert_not_called()
+    assert cached_user.email == user.email
+    assert cached_user.hashed_password == user.hashed_password
+
+
+async def test_update_user_invalidates_cache(session: AsyncSession, user):
+    await crud.get_user_by_id(session=session, user_id=user.id)
+    await update_user(session=session, db_user=user,
+                user_in=UserUpdate(email="updated@example.com"))
+    assert crud.user_cache.get(str(user.id)) is None
+    assert (await crud.get_user_by_id(
+        session=session, user_id=user.id)).email == "updated@example.com"
+
+
+async def test_enable_otp(session: AsyncSession, user):
+    await enable_otp(session=session, db_user=user)
     assert user.otp_enabled == True
 
 
-def test_get_otp_user_by_email(session: Session, user_with_otp):
-    is_otp_enabled = get_otp_user_by_email(
+async def test_enable_otp_is_a_single_update_returning(session: AsyncSession, user):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(session.bind.sync_engine, "before_cursor_execute", listener)
+    try:
+        await config_otp(session=session, db_user=user)
+    finally:
+        event.remove(session.bind.sync_engine, "before_cursor_execute", listener)
+    assert len(statements) == 1
+    assert statements[0].startswith('UPDATE "user" SET otp_secret=')
+    assert "RETURNING" in statements[0]
+    assert user.otp_secret is not None
+
+
+async def test_get_otp_user_by_email(session: AsyncSession, user_with_otp):
+    is_otp_enabled = await get_otp_user_by_email(
         session=session, email="test@example.com")
     assert is_otp_enabled == True
 
 
-def test_validate_otp(session: Session, user_with_otp):
+async def test_validate_otp(session: AsyncSession, user_with_otp):
     # Generate a valid TOTP code
     totp = pyotp.TOTP(user_with_otp.otp_secret)
     valid_totp_code = totp.now()
 
     # Test with valid TOTP code
-    validated_user = validate_otp(
+    validated_user = await validate_otp(
         session=session, email="test@example.com", totp_code=valid_totp_code)
     assert validated_user is not None
     assert validated_user.email == "test@example.com"
 
     # Test with invalid TOTP code
     invalid_totp_code = "123456"
-    validated_user = validate_otp(
+    validated_user = await validate_otp(
         session=session, email="test@example.com", totp_code=invalid_totp_code)
     assert validated_user is None
 
     # Test with no TOTP code
-    validated_user = validate_otp(
+    validated_user = await validate_otp(
         session=session, email="test@example.com", totp_code="")
     assert validated_user is None
 
     # Test with user not having OTP enabled
     user_create = UserCreate(email="nootp@example.com",
                              password="password123", username="nootp@example.com", otp_enabled=False)
-    create_user(session=session, user_create=user_create)
-    validated_user = validate_otp(
+    await create_user(session=session, user_create=user_create)
+    validated_user = await validate_otp(
         session=session, email="nootp@example.com", totp_code=valid_totp_code)
     assert validated_user is not None
     assert validated_user.email == "nootp@example.com"
+
+
+async def test_create_user_if_absent(session: AsyncSession):
+    user_create = UserCreate(email="test@example.com", password="password123")
+    user = await crud.create_user_if_absent(session=session, user_create=user_create)
+    assert user is not None
+    assert user.email == "test@example.com"
+    assert verify_password("password123", user.hashed_password)
+    assert await crud.create_user_if_absent(session=session, user_create=user_create) is None
+
+
+async def test_create_user_if_absent_concurrent_signups(session: AsyncSession):
+    user_create = UserCreate(email="race@example.com", password="password123")
+
+    async def signup():
+        async with AsyncSession(session.bind, expire_on_commit=False) as own_session:
+            return await crud.create_user_if_absent(session=own_session, user_create=user_create)
+
+    results = await asyncio.gather(*(signup() for _ in range(5)))
+    assert sum(result is not None for result in results) == 1
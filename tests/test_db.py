@@ -1,5 +1,10 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import select
-from app.core.db import init_db
+from app.core.db import engine_options, init_db, listen_user_changes
 
 from app.models import User
 from app.schemas import UserCreate
@@ -7,22 +12,24 @@ from app import crud
 
 from app.core.config import settings
 
+pytestmark = pytest.mark.anyio
+
 
-def test_init_db(session):
+async def test_init_db(session):
     # Asegurarse de que la base de datos esté vacía al inicio
-    users = session.exec(select(User)).all()
+    users = (await session.exec(select(User))).all()
     assert len(users) == 0
 
     # Inicializar la base de datos
-    init_db(session)
+    await init_db(session)
 
     # Verificar si se creó el superusuario
-    user = session.exec(select(User).where(User.email == settings.FIRST_SUPERUSER)).first()
+    user = (await session.exec(select(User).where(User.email == settings.FIRST_SUPERUSER))).first()
     assert user is not None
     assert user.email == settings.FIRST_SUPERUSER
     assert user.is_superuser is True
 
-def test_init_db_existing_user(session):
+async def test_init_db_existing_user(session):
     # Crear un usuario manualmente
     user_in = UserCreate(
         email=settings.FIRST_SUPERUSER,
@@ -31,11 +38,62 @@ def test_init_db_existing_user(session):
         is_superuser=True,
     )
     
-    crud.create_user(session=session, user_create=user_in)
+    await crud.create_user(session=session, user_create=user_in)
 
     # Inicializar la base de datos
-    init_db(session)
+    await init_db(session)
     
     # Asegurarse de que no se creó un usuario duplicado
-    users = session.exec(select(User).where(User.email == settings.FIRST_SUPERUSER)).all()
-    assert len(users) == 1
\ No newline at end of file
+    users = (await session.exec(select(User).where(User.email == settings.FIRST_SUPERUSER))).all()
+    assert len(users) == 1
+
+
+async def test_listen_user_changes(session):
+    user = await crud.create_user(session=session, user_create=UserCreate(
+        email="listener@example.com", password="password123"))
+    connected = asyncio.Event()
+    changed = asyncio.Queue()
+    listener = asyncio.create_task(
+        listen_user_changes(changed.put_nowait, connected.set))
+    try:
+        await asyncio.wait_for(connected.wait(), 5)
+
+        # Un UPDATE hecho por otra conexión (otro worker) publica el id
+        user.full_name = "Changed"
+        session.add(user)
+        await session.commit()
+        assert await asyncio.wait_for(changed.get(), 5) == str(user.id)
+
+        await session.delete(user)
+        await session.commit()
+        assert await asyncio.wait_for(changed.get(), 5) == str(user.id)
+    finally:
+        listener.cancel()
+
+
+
+async def _prepared_statements(engine) -> int:
+    async with engine.connect() as connection:
+        for _ in range(10):
+            await connection.execute(select(User).where(User.email == "x@example.com"))
+        result = await connection.exec_driver_sql("SELECT count(*) FROM pg_prepared_statements")
+        return result.scalar()
+
+
+async def test_engine_options_transaction_pooling():
+    options = engine_options("transaction")
+    assert options["poolclass"] is NullPool
+    # Detrás de un pooler en modo transacción no debe haber prepared statements
+    # en el servidor: la siguiente consulta puede llegar a otra conexión
+    engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI), **options)
+    try:
+        assert await _prepared_statements(engine) == 0
+    finally:
+        await engine.dispose()
+
+    engine = create_async_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI), **engine_options("internal"))
+    try:
+        assert await _prepared_statements(engine) > 0
+    finally:
+        await engine.dispose()
@@ -1,16 +1,21 @@
 import uuid
+from datetime import timedelta
 from jwt import InvalidTokenError
 import pytest
 from fastapi import HTTPException, status
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from unittest.mock import MagicMock, patch
-from app.api.deps import get_current_user, get_current_active_superuser
+from app.api.deps import decode_token, get_current_user, get_current_active_superuser, token_cache
+from app.core.security import create_access_token
 from app.models import User
 from app.schemas import TokenPayload
+import jwt
+
+pytestmark = pytest.mark.anyio
 
 @pytest.fixture
 def session():
-  return MagicMock(spec=Session)
+  return MagicMock(spec=AsyncSession)
 
 @pytest.fixture
 def token():
@@ -24,41 +29,58 @@ def user():
 def superuser():
   return User(id=str(uuid.uuid4()), is_active=True, is_superuser=True)
 
-def test_get_current_user_valid_token(session, token, user):
+async def test_get_current_user_valid_token(session, token, user):
   with patch("app.api.deps.jwt.decode", return_value={"sub": user.id}), \
      patch("app.api.deps.TokenPayload", return_value=TokenPayload(sub=user.id)), \
      patch.object(session, "get", return_value=user):
-    result = get_current_user(session, token)
+    result = await get_current_user(session, token)
     assert result == user
 
-def test_get_current_user_invalid_token(session, token):
+async def test_get_current_user_invalid_token(session, token):
   with patch("app.api.deps.jwt.decode", side_effect=InvalidTokenError):
     with pytest.raises(HTTPException) as exc_info:
-      get_current_user(session, token)
+      await get_current_user(session, token)
     assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
 
-def test_get_current_user_user_not_found(session, token):
+async def test_get_current_user_user_not_found(session, token):
   with patch("app.api.deps.jwt.decode", return_value={"sub": str(uuid.uuid4())}), \
      patch("app.api.deps.TokenPayload", return_value=TokenPayload(sub=str(uuid.uuid4()))), \
      patch.object(session, "get", return_value=None):
     with pytest.raises(HTTPException) as exc_info:
-      get_current_user(session, token)
+      await get_current_user(session, token)
     assert exc_info.value.status_code == 404
 
-def test_get_current_user_inactive_user(session, token, user):
+async def test_get_current_user_inactive_user(session, token, user):
   user.is_active = False
   with patch("app.api.deps.jwt.decode", return_value={"sub": user.id}), \
      patch("app.api.deps.TokenPayload", return_value=TokenPayload(sub=user.id)), \
      patch.object(session, "get", return_value=user):
     with pytest.raises(HTTPException) as exc_info:
-      get_current_user(session, token)
+      await get_current_user(session, token)
     assert exc_info.value.status_code == 400
 
-def test_get_current_active_superuser_valid_superuser(superuser):
-  result = get_current_active_superuser(superuser)
+def test_decode_token_uses_cache():
+  token_cache.clear()
+  sub = str(uuid.uuid4())
+  token = create_access_token({"sub": sub}, timedelta(minutes=5))
+  with patch("app.api.deps.jwt.decode", wraps=jwt.decode) as mock_decode:
+    assert decode_token(token).sub == sub
+    assert decode_token(token).sub == sub
+    assert mock_decode.call_count == 1
+  assert token_cache.hits == 1
+  assert token_cache.misses == 1
+
+def test_decode_token_expired():
+  token = create_access_token({"sub": str(uuid.uuid4())}, timedelta(minutes=-1))
+  with pytest.raises(HTTPException) as exc_info:
+    decode_token(token)
+  assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+
+async def test_get_current_active_superuser_valid_superuser(superuser):
+  result = await get_current_active_superuser(superuser)
   assert result == superuser
 
-def test_get_current_active_superuser_not_superuser(user):
+async def test_get_current_active_superuser_not_superuser(user):
   with pytest.raises(HTTPException) as exc_info:
-    get_current_active_superuser(user)
+    await get_current_active_superuser(user)
   assert exc_info.value.status_code == 403
\ No newline at end of file
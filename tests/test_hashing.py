@@ -0,0 +1,37 @@
+import pytest
+
+from app.core.hashing import HashingService, HashingUnavailableError
+from app.core.security import hasher, pwd_context, verify_password
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_hash_and_verify():
+    hashed_password = await hasher.hash("test_password")
+
+    assert hashed_password != "test_password"
+    assert verify_password("test_password", hashed_password)
+    assert await hasher.verify("test_password", hashed_password) is True
+    assert await hasher.verify("wrong_password", hashed_password) is False
+    assert hasher.pending == 0
+
+
+async def test_queue_full():
+    service = HashingService(
+        pwd_context.to_string(), max_workers=1, max_pending=0, timeout=5
+    )
+    with pytest.raises(HashingUnavailableError, match="queue is full"):
+        await service.hash("test_password")
+    assert service.pending == 0
+
+
+async def test_timeout():
+    service = HashingService(
+        pwd_context.to_string(), max_workers=1, max_pending=1, timeout=0.0001
+    )
+    try:
+        with pytest.raises(HashingUnavailableError, match="timed out"):
+            await service.hash("test_password")
+        assert service.pending == 0
+    finally:
+        service.shutdown()
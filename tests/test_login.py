@@ -2,7 +2,8 @@ from datetime import timedelta
 import uuid
 import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app import crud
 from app.crud import create_user
 from app.main import app
@@ -17,14 +18,16 @@ from app.utils import generate_password_reset_token
 
 client = TestClient(app)
 
+pytestmark = pytest.mark.anyio
+
 
 @pytest.fixture
-def test_user(session: Session):
+async def test_user(session: AsyncSession):
     """Crear un usuario para las pruebas."""
-    return create_user(session=session, user_create=UserCreate(id=str(uuid.uuid4()), otp_enabled=False, email="test@example.com", password="password123"))
+    return await create_user(session=session, user_create=UserCreate(id=str(uuid.uuid4()), otp_enabled=False, email="test@example.com", password="password123"))
 
 
-def test_login_access_token(test_user):
+async def test_login_access_token(test_user):
     response = client.post(
         "/api/v1/login/access-token",
         data={"username": "test@example.com", "password": "password123"},
@@ -35,7 +38,7 @@ def test_login_access_token(test_user):
     assert data["requires_totp"] is False
 
 
-def test_login_access_token_wrong_password(test_user):
+async def test_login_access_token_wrong_password(test_user):
     response = client.post(
         "/api/v1/login/access-token",
         data={"username": "test@example.com", "password": "wrongpassword"},
@@ -44,10 +47,10 @@ def test_login_access_token_wrong_password(test_user):
     assert response.json()["detail"] == "Incorrect email or password"
 
 
-def test_login_access_token_with_totp(session, test_user):
+async def test_login_access_token_with_totp(session, test_user):
     test_user.otp_enabled = True
     session.add(test_user)
-    session.commit()
+    await session.commit()
 
     response = client.post(
         "/api/v1/login/access-token",
@@ -59,7 +62,7 @@ def test_login_access_token_with_totp(session, test_user):
     assert data["requires_totp"] is True
 
 
-def test_login_access_token_otp(session, test_user):
+async def test_login_access_token_otp(session, test_user):
     temp_token = create_access_token(
         {"sub": test_user.email, "type": "temp_totp", "totp_required": True},
         expires_delta=timedelta(minutes=5),
@@ -75,7 +78,7 @@ def test_login_access_token_otp(session, test_user):
         assert "access_token" in data
 
 
-def test_token_test(test_user):
+async def test_token_test(test_user):
     token = create_access_token(
         {"sub": str(test_user.id), "type": "access"}, expires_delta=timedelta(minutes=5))
     headers = {"Authorization": f"Bearer {token}"}
@@ -86,7 +89,7 @@ def test_token_test(test_user):
 
 
 @patch("app.mails.send_email")
-def test_password_recovery(mock_send_email, test_user):
+async def test_password_recovery(mock_send_email, test_user):
     response = client.post(f"/api/v1/password-recovery/{test_user.email}")
     assert response.status_code == 200
     assert response.json()[
@@ -94,7 +97,7 @@ def test_password_recovery(mock_send_email, test_user):
     mock_send_email.assert_called_once()
 
 
-def test_reset_password(session, test_user):
+async def test_reset_password(session, test_user):
     token = generate_password_reset_token(test_user.email)
     new_password = "newpassword123"
     response = client.post(
@@ -106,10 +109,10 @@ def test_reset_password(session, test_user):
 
     
     # Obtener el usuario nuevamente para verificar si la contraseña fue actualizada
-    updated_user = crud.get_user_by_email(session=session, email=test_user.email)
+    updated_user = await crud.get_user_by_email(session=session, email=test_user.email)
     
     # Refrescar la instancia del usuario para asegurarse de que tenga los datos más recientes
-    session.refresh(updated_user)
+    await session.refresh(updated_user)
     
     # Verificar que la nueva contraseña sea válida
     # Verificar que el usuario puede autenticarse con la nueva contraseña
@@ -0,0 +1,114 @@
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import crud
+from app.core.config import settings
+from app.core.pool import (
+    InstrumentedAsyncQueuePool,
+    PoolMetrics,
+    ping_idle_connections,
+    pool_limits,
+)
+from app.schemas import UserCreate
+
+pytestmark = pytest.mark.anyio
+
+
+def test_pool_limits_without_budget():
+    assert pool_limits(pool_size=5, max_overflow=10, max_connections=None, workers=2) == (5, 10)
+
+
+def test_pool_limits_splits_budget_between_workers():
+    # 40 conexiones para 4 workers, una reservada por worker para el listener
+    assert pool_limits(
+        pool_size=5, max_overflow=10, max_connections=40, workers=4, reserved=1
+    ) == (5, 4)
+    assert pool_limits(
+        pool_size=20, max_overflow=10, max_connections=40, workers=4, reserved=1
+    ) == (9, 0)
+
+
+def test_pool_limits_budget_too_small():
+    with pytest.raises(ValueError):
+        pool_limits(pool_size=5, max_overflow=10, max_connections=2, workers=2, reserved=1)
+
+
+def test_pool_metrics_histogram():
+    metrics = PoolMetrics(buckets=(0.01, 0.1))
+    metrics.observe_wait(0.001)
+    metrics.observe_wait(0.05)
+    metrics.observe_wait(1)
+    assert metrics.checkouts == 3
+    assert metrics.histogram() == {"0.01": 1, "0.1": 2, "+Inf": 3}
+
+
+async def test_instrumented_pool_records_checkouts_and_timeouts():
+    engine = create_async_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI),
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    try:
+        async with engine.connect():
+            assert engine.pool.stats()["checked_out"] == 1
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+        stats = engine.pool.stats()
+        assert stats["checked_out"] == 0
+        assert stats["checkouts"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["checkout_wait_seconds_bucket"]["+Inf"] == 1
+
+        # Las métricas sobreviven al reemplazo del pool
+        await engine.dispose()
+        assert engine.pool.stats()["timeouts"] == 1
+    finally:
+        await engine.dispose()
+
+
+async def _engine_with_dead_connection():
+    """Motor sin pre_ping cuya única conexión libre fue cerrada por el servidor."""
+    engine = create_async_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI),
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_pre_ping=False,
+    )
+    async with engine.connect() as connection:
+        pid = (await connection.execute(text("SELECT pg_backend_pid()"))).scalar()
+    killer = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    async with killer.connect() as connection:
+        await connection.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": pid})
+    await killer.dispose()
+    return engine
+
+
+async def test_ping_idle_connections_replaces_dead_connection():
+    engine = await _engine_with_dead_connection()
+    try:
+        assert await ping_idle_connections(engine) == 1
+        # La conexión ya fue reemplazada: la siguiente request no falla
+        async with engine.connect() as connection:
+            assert (await connection.execute(text("SELECT 1"))).scalar() == 1
+        assert await ping_idle_connections(engine) == 0
+    finally:
+        await engine.dispose()
+
+
+async def test_read_retries_once_on_dead_connection(session):
+    await crud.create_user(session=session, user_create=UserCreate(
+        email="test@example.com", password="password123"))
+    engine = await _engine_with_dead_connection()
+    try:
+        async with AsyncSession(engine) as pooled_session:
+            user = await crud.get_user_by_email(
+                session=pooled_session, email="test@example.com")
+        assert user is not None
+    finally:
+        await engine.dispose()
@@ -1,6 +1,6 @@
 from datetime import  timedelta
 import uuid
-from app.core.security import create_access_token, verify_password, get_password_hash, generate_otp_secret, verify_otp
+from app.core.security import build_pwd_context, create_access_token, verify_password, get_password_hash, generate_otp_secret, verify_otp
 from app.core.config import settings
 import pyotp
 import jwt
@@ -30,6 +30,21 @@ def test_get_password_hash():
   assert hashed_password != password
   assert verify_password(password, hashed_password) == True
 
+def test_build_pwd_context_flags_outdated_hashes():
+  bcrypt_context = build_pwd_context(
+    "bcrypt", bcrypt_rounds=4, argon2_memory_cost=1024, argon2_time_cost=2, argon2_parallelism=1)
+  argon2_context = build_pwd_context(
+    "argon2", bcrypt_rounds=5, argon2_memory_cost=1024, argon2_time_cost=2, argon2_parallelism=1)
+  bcrypt_hash = bcrypt_context.hash("test_password")
+
+  assert argon2_context.verify("test_password", bcrypt_hash)
+  assert argon2_context.needs_update(bcrypt_hash)
+  assert argon2_context.hash("test_password").startswith("$argon2id$")
+  assert not bcrypt_context.needs_update(bcrypt_hash)
+  stronger_bcrypt = build_pwd_context(
+    "bcrypt", bcrypt_rounds=5, argon2_memory_cost=1024, argon2_time_cost=2, argon2_parallelism=1)
+  assert stronger_bcrypt.needs_update(bcrypt_hash)
+
 def test_generate_otp_secret():
     secret = generate_otp_secret()
     assert len(secret) == 32
@@ -0,0 +1,98 @@
+import json
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app import crud, user_import
+from app.core import security
+from app.core.config import settings
+from app.core.security import hasher, pwd_context, verify_password
+from app.main import app
+from app.models import User
+from app.schemas import UserCreate
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.anyio
+
+CSV = """email,full_name,password,hashed_password
+one@example.com,One,password123,
+two@example.com,Two,,{hashed}
+not-an-email,Invalid,password123,
+one@example.com,Duplicate,password123,
+"""
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+async def test_iter_lines_splits_multibyte_characters():
+    data = "josé@example.com\nzoë@example.com".encode()
+    lines = await _collect(user_import.iter_lines(_chunks(data[:4], data[4:20], data[20:])))
+    assert lines == ["josé@example.com", "zoë@example.com"]
+
+
+async def test_parse_records_csv_and_ndjson():
+    csv_lines = _collect(user_import.parse_records(
+        user_import.iter_lines(_chunks(b"email,full_name\r\na@example.com,\r\n")), "csv"))
+    assert await csv_lines == [{"email": "a@example.com"}]
+    ndjson_lines = _collect(user_import.parse_records(
+        user_import.iter_lines(_chunks(b'{"email": "a@example.com"}\nnot json\n')), "ndjson"))
+    assert await ndjson_lines == [{"email": "a@example.com"}, None]
+
+
+async def test_import_users(session):
+    records = user_import.parse_records(user_import.iter_lines(_chunks(
+        CSV.format(hashed=pwd_context.hash("prehashed123")).encode())), "csv")
+    progress = await _collect(user_import.import_users(
+        records, engine=session.bind, hashing=hasher, chunk_size=2))
+
+    assert [p.processed for p in progress] == [2, 4]
+    final = progress[-1]
+    assert (final.inserted, final.duplicates, final.invalid, final.error) == (2, 1, 1, None)
+
+    users = {user.email: user for user in (await session.exec(select(User))).all()}
+    assert users["one@example.com"].full_name == "One"
+    assert verify_password("password123", users["one@example.com"].hashed_password)
+    assert verify_password("prehashed123", users["two@example.com"].hashed_password)
+
+
+async def test_import_users_resumes_with_skip(session):
+    records = user_import.parse_records(user_import.iter_lines(_chunks(
+        CSV.format(hashed=pwd_context.hash("prehashed123")).encode())), "csv")
+    progress = await _collect(user_import.import_users(
+        records, engine=session.bind, hashing=hasher, chunk_size=10, skip=1))
+
+    assert progress[-1].processed == 4
+    assert (progress[-1].inserted, progress[-1].duplicates, progress[-1].invalid) == (2, 0, 1)
+    emails = (await session.exec(select(User.email))).all()
+    assert sorted(emails) == ["one@example.com", "two@example.com"]
+
+
+async def test_import_users_endpoint(session):
+    admin = await crud.create_user(session=session, user_create=UserCreate(
+        email="admin@example.com", password="password", is_superuser=True))
+    token = security.create_access_token({"sub": str(admin.id)}, timedelta(minutes=5))
+    body = "\n".join(json.dumps(record) for record in [
+        {"email": "new@example.com", "password": "password123"},
+        {"email": "admin@example.com", "password": "password123"},
+    ])
+    response = client.post(
+        f"{settings.API_V_STR}/users/import?format=ndjson",
+        content=body,
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    progress = [json.loads(line) for line in response.text.splitlines()]
+    assert progress[-1]["processed"] == 2
+    assert progress[-1]["inserted"] == 1
+    assert progress[-1]["duplicates"] == 1
+    assert await crud.get_user_by_email(session=session, email="new@example.com") is not None
@@ -9,11 +9,13 @@ from app.core.config import settings
 
 client = TestClient(app)
 
+pytestmark = pytest.mark.anyio
+
 
 @pytest.fixture
-def current_user(session):
+async def current_user(session):
     # Mock the current user dependency
-    user = crud.create_user(
+    user = await crud.create_user(
         session=session,
         user_create=UserCreate(
             email="test@example.com",
@@ -31,7 +33,7 @@ def token(current_user):
     yield token
 
 
-def test_update_user_me(session, token):
+async def test_update_user_me(session, token):
     response = client.patch(
         f"{settings.API_V_STR}/users/me",
         json={"email": "newemail@example.com", "full_name": "New Name"},
@@ -41,7 +43,7 @@ def test_update_user_me(session, token):
     assert response.json()["email"] == "newemail@example.com"
 
 
-def test_update_password_me(session, token):
+async def test_update_password_me(session, token):
     response = client.patch(
         f"{settings.API_V_STR}/users/me/password",
         json={"current_password": "password", "new_password": "newpassword"},
@@ -51,7 +53,7 @@ def test_update_password_me(session, token):
     assert response.json()["message"] == "Password updated successfully"
 
 
-def test_read_user_me(current_user, token):
+async def test_read_user_me(current_user, token):
     response = client.get(
         f"{settings.API_V_STR}/users/me",
         headers={"Authorization": f"Bearer {token}"}
@@ -60,7 +62,21 @@ def test_read_user_me(current_user, token):
     assert response.json()["email"] == current_user.email
 
 
-def test_delete_user_me(session, token):
+async def test_update_user_me_is_visible_on_cached_read(session, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    # La primera lectura deja al usuario en la caché de principales
+    assert client.get(f"{settings.API_V_STR}/users/me", headers=headers).status_code == 200
+    response = client.patch(
+        f"{settings.API_V_STR}/users/me",
+        json={"full_name": "Cached Name"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    response = client.get(f"{settings.API_V_STR}/users/me", headers=headers)
+    assert response.json()["full_name"] == "Cached Name"
+
+
+async def test_delete_user_me(session, token):
     response = client.delete(
         f"{settings.API_V_STR}/users/me",
         headers={"Authorization": f"Bearer {token}"}
@@ -69,10 +85,18 @@ def test_delete_user_me(session, token):
     assert response.json()["message"] == "User deleted successfully"
 
 
-def test_register_user(session):
+async def test_register_user(session):
     response = client.post(
         f"{settings.API_V_STR}/users/signup",
         json={"email": "newuser@example.com", "password": "newpassword"}
     )
     assert response.status_code == 200
     assert response.json()["email"] == "newuser@example.com"
+
+
+async def test_register_user_duplicate_email(session):
+    payload = {"email": "newuser@example.com", "password": "newpassword"}
+    assert client.post(f"{settings.API_V_STR}/users/signup", json=payload).status_code == 200
+    response = client.post(f"{settings.API_V_STR}/users/signup", json=payload)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "The user with this email already exists in the system"
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import crud
+from app.core import security
+from app.core.config import settings
+from app.main import app
+from app.schemas import UserCreate
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.anyio
+
+
+async def _auth_headers(session, *, is_superuser: bool) -> dict[str, str]:
+    user = await crud.create_user(session=session, user_create=UserCreate(
+        email="admin@example.com", password="password", is_superuser=is_superuser))
+    token = security.create_access_token({"sub": str(user.id)}, timedelta(minutes=5))
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_db_pool_stats(session):
+    headers = await _auth_headers(session, is_superuser=True)
+    response = client.get(f"{settings.API_V_STR}/utils/db-pool", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["size"] == settings.DB_POOL_SIZE
+    assert data["checkouts"] >= 1
+    assert "+Inf" in data["checkout_wait_seconds_bucket"]
+
+
+async def test_db_pool_stats_requires_superuser(session):
+    headers = await _auth_headers(session, is_superuser=False)
+    response = client.get(f"{settings.API_V_STR}/utils/db-pool", headers=headers)
+    assert response.status_code == 403